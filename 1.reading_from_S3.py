@@ -63,18 +63,33 @@ print(f"Found {len(json_keys)} JSON files")
 # ---------------------------------------------------
 # READ + LOAD JSON FILES
 # ---------------------------------------------------
+# BACKFILL = True decodes + flattens across a process pool (see backfill.py).
+# Differences from json_normalize: list fields come back as JSON strings,
+# empty dicts as a '{}' column, and malformed or non-object JSON files as a
+# raw_body row instead of raising.
+BACKFILL = False
+BACKFILL_WORKERS = None   # None = all cores
+
 records = []
+raw_bodies = []
 
 for key in json_keys:
     obj = s3.get_object(Bucket=bucket_name, Key=key)
     raw = obj["Body"].read().decode("utf-8")
-    data = json.loads(raw)
-    records.append(data)
+    if BACKFILL:
+        raw_bodies.append(raw)
+    else:
+        data = json.loads(raw)
+        records.append(data)
 
 # ---------------------------------------------------
 # CONVERT TO DATAFRAME (ALL FIELDS)
 # ---------------------------------------------------
-df = pd.json_normalize(records)
+if BACKFILL:
+    from backfill import parallel_flatten
+    df = parallel_flatten(raw_bodies, workers=BACKFILL_WORKERS)
+else:
+    df = pd.json_normalize(records)
 
 # ---------------------------------------------------
 # DONE
@@ -369,23 +384,14 @@ plt.show()
 # COMMAND ----------
 
 # 1.5 Booking Volume by Time Slot / Day of Week
-# Hour of day
-final_df['hour'] = final_df['booking_timestamp'].dt.hour
-
-# Day name (Monday, Tuesday, ...)
-final_df['day_of_week'] = final_df['booking_timestamp'].dt.day_name()
+import timebuckets
 
-# Enforce correct weekday order (important for charts & heatmaps)
-weekday_order = [
-    'Monday', 'Tuesday', 'Wednesday',
-    'Thursday', 'Friday', 'Saturday', 'Sunday'
-]
+# int8 hour_utc / dow_utc / hour_local / dow_local, converted per invitee
+# timezone (payload.timezone) so the heatmap isn't shifted for non-UTC invitees
+timebuckets.add_time_buckets(final_df)
 
-final_df['day_of_week'] = pd.Categorical(
-    final_df['day_of_week'],
-    categories=weekday_order,
-    ordered=True
-)
+# Heatmap: unique bookings per (day of week, hour) in invitee-local time
+time_heatmap = timebuckets.hour_dow_matrix(final_df, view='local')
 
 
 
@@ -420,7 +426,7 @@ plt.show()
 # COMMAND ----------
 
 plt.figure()
-plt.hist(final_df['hour'], bins=24)
+plt.bar(timebuckets.HOURS, timebuckets.hour_counts(final_df, view='local'), width=1.0)
 plt.title('Bookings by Hour')
 plt.xlabel('Hour')
 plt.ylabel('Bookings')
@@ -429,7 +435,8 @@ plt.show()
 
 # COMMAND ----------
 
-dow_counts = final_df['day_of_week'].value_counts()
+dow_counts = timebuckets.dow_counts(final_df, view='local')
+dow_counts = dow_counts[dow_counts > 0]
 
 plt.figure()
 plt.pie(dow_counts, labels=dow_counts.index, autopct='%1.1f%%')
@@ -577,3 +584,18 @@ final_df_expanded = final_df_expanded.dropna(subset=['user_name'])
 
 # Check results
 final_df_expanded.user_name.value_counts()
+
+# COMMAND ----------
+
+# Distinct-count sketches (HyperLogLog, see sketches.py), one file per
+# booking_date partition, so the dashboard can roll up months of bookings
+# from small stored sketches instead of keeping every id.
+import sketches
+
+SKETCH_DIR = "calendly_sketches"
+
+final_df_expanded['week'] = final_df_expanded['meeting_date'].dt.to_period('W')
+
+sketches.write_partition_sketches(final_df, SKETCH_DIR, "bookings_by_date_channel")
+sketches.write_partition_sketches(final_df, SKETCH_DIR, "bookings_by_dow_hour")
+sketches.write_partition_sketches(final_df_expanded, SKETCH_DIR, "meetings_by_user_week")
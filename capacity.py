@@ -0,0 +1,186 @@
+# capacity.py
+# Interval-sweep engine for concurrent meeting load and employee capacity.
+#
+# Every meeting becomes a +1 event at its start and a -1 event at its end.
+# Sorting all events by (user, time, delta) and taking one cumulative sum
+# gives the number of concurrent meetings per host at every change point
+# (each host's deltas sum to zero, so the running sum resets between
+# hosts without a groupby). Everything after the sort is vectorized, so
+# the whole pass is O(n log n) over all meetings and hosts.
+import time
+
+import numpy as np
+import pandas as pd
+
+# -----------------------------
+# CONFIG
+# -----------------------------
+START_COL = 'payload.scheduled_event.start_time'
+END_COL = 'payload.scheduled_event.end_time'
+STATUS_COL = 'payload.scheduled_event.status'
+NS_PER_MINUTE = 60 * 10**9
+
+
+# -----------------------------
+# Intervals from the exploded memberships table
+# -----------------------------
+def _to_ns(times):
+    return times.dt.tz_localize(None).to_numpy('datetime64[ns]').view('i8')
+
+
+def meeting_intervals(expanded, active_only=True):
+    """One row per (host, scheduled event) with UTC start/end.
+
+    `expanded` is final_df_expanded (one row per invitee x host), so group
+    events with several invitees are deduplicated on booking_id. With
+    active_only, a booking is dropped if any of its rows says canceled:
+    the earlier invitee.created row for it still says active.
+    """
+    df = expanded
+    if active_only and STATUS_COL in df:
+        canceled = df.loc[df[STATUS_COL] == 'canceled', 'booking_id']
+        df = df[~df['booking_id'].isin(canceled)]
+
+    start = pd.to_datetime(df[START_COL], utc=True)
+    end = pd.to_datetime(df[END_COL], utc=True)
+    # Mask missing values before the int64 view: NaT would become INT64_MIN
+    valid = (start.notna() & end.notna() & df['user_name'].notna() & df['booking_id'].notna()).to_numpy()
+
+    out = pd.DataFrame({
+        'user_name': df['user_name'].to_numpy()[valid],
+        'booking_id': df['booking_id'].to_numpy()[valid],
+        'start': _to_ns(start[valid]),
+        'end': _to_ns(end[valid]),
+    })
+    out = out.drop_duplicates(['user_name', 'booking_id'])
+    return out[out['end'] > out['start']].reset_index(drop=True)
+
+
+# -----------------------------
+# Sweep
+# -----------------------------
+def _sweep(intervals):
+    codes, users = pd.factorize(intervals['user_name'], sort=True)
+    users = np.asarray(users)
+    start = intervals['start'].to_numpy(dtype=np.int64)
+    end = intervals['end'].to_numpy(dtype=np.int64)
+    n = len(intervals)
+
+    user = np.concatenate([codes, codes])
+    t = np.concatenate([start, end])
+    delta = np.concatenate([np.ones(n, np.int64), -np.ones(n, np.int64)])
+
+    # Ends sort before starts at the same instant: back-to-back is not overlap
+    order = np.lexsort((delta, t, user))
+    user, t, delta = user[order], t[order], delta[order]
+    level = np.cumsum(delta)
+    return users, user, t, delta, level
+
+
+def _segments(user, t, level):
+    # Constant-concurrency segments [t[i], t[i+1]) within the same host
+    same = user[:-1] == user[1:]
+    seg_start, seg_end = t[:-1][same], t[1:][same]
+    seg_user, seg_level = user[:-1][same], level[:-1][same]
+    keep = (seg_level > 0) & (seg_end > seg_start)
+    return seg_user[keep], seg_start[keep], seg_end[keep], seg_level[keep]
+
+
+def load_summary(intervals):
+    """Per host: meetings, busy/overlap minutes, peak concurrency, double-bookings."""
+    if not len(intervals):
+        return pd.DataFrame(columns=['user_name', 'meetings', 'busy_minutes', 'overlap_minutes',
+                                     'peak_concurrency', 'double_bookings'])
+    users, user, t, delta, level = _sweep(intervals)
+    seg_user, seg_start, seg_end, seg_level = _segments(user, t, level)
+    length = (seg_end - seg_start) / NS_PER_MINUTE
+
+    n_users = len(users)
+    is_start = delta > 0
+    summary = pd.DataFrame({
+        'user_name': users,
+        'meetings': np.bincount(user[is_start], minlength=n_users),
+        'busy_minutes': np.bincount(seg_user, weights=length, minlength=n_users),
+        'overlap_minutes': np.bincount(seg_user, weights=length * (seg_level > 1), minlength=n_users),
+        'peak_concurrency': pd.Series(level).groupby(user).max().reindex(range(n_users), fill_value=0).to_numpy(),
+        # a meeting that starts while another is already running
+        'double_bookings': np.bincount(user[is_start & (level > 1)], minlength=n_users),
+    })
+    return summary
+
+
+def load_by_slot(intervals, freq='1h'):
+    """Busy/free minutes, peak concurrency and double-bookings per host per time slot.
+
+    `freq` is any fixed duration pandas understands ('30min', '1h', '1D').
+    Slots are UTC-aligned; only slots in which a host has a meeting are listed.
+    """
+    columns = ['user_name', 'slot', 'busy_minutes', 'free_minutes', 'peak_concurrency', 'double_bookings']
+    if not len(intervals):
+        return pd.DataFrame(columns=columns)
+    slot_ns = pd.Timedelta(freq).value
+    users, user, t, delta, level = _sweep(intervals)
+    seg_user, seg_start, seg_end, seg_level = _segments(user, t, level)
+
+    # Split segments that cross slot boundaries into one piece per slot
+    first = seg_start // slot_ns
+    last = (seg_end - 1) // slot_ns
+    pieces = last - first + 1
+    rep = np.repeat(np.arange(len(seg_start)), pieces)
+    offset = np.arange(len(rep)) - np.repeat(np.cumsum(pieces) - pieces, pieces)
+    slot = first[rep] + offset
+    lo = np.maximum(seg_start[rep], slot * slot_ns)
+    hi = np.minimum(seg_end[rep], (slot + 1) * slot_ns)
+
+    per_slot = pd.DataFrame({
+        'user': seg_user[rep],
+        'slot': slot,
+        'busy_minutes': (hi - lo) / NS_PER_MINUTE,
+        'peak_concurrency': seg_level[rep],
+    }).groupby(['user', 'slot'], sort=True).agg(
+        busy_minutes=('busy_minutes', 'sum'),
+        peak_concurrency=('peak_concurrency', 'max'),
+    ).reset_index()
+
+    # Double-bookings (same rule as load_summary), counted in the slot the meeting starts in
+    is_double = (delta > 0) & (level > 1)
+    doubles = pd.DataFrame({'user': user[is_double], 'slot': t[is_double] // slot_ns}).value_counts()
+    per_slot['double_bookings'] = (
+        doubles.reindex(pd.MultiIndex.from_frame(per_slot[['user', 'slot']])).fillna(0).astype(np.int64).to_numpy())
+
+    per_slot['user_name'] = users[per_slot['user'].to_numpy()]
+    per_slot['slot'] = pd.to_datetime(per_slot['slot'] * slot_ns, utc=True)
+    per_slot['free_minutes'] = slot_ns / NS_PER_MINUTE - per_slot['busy_minutes']
+    return per_slot[columns]
+
+
+# -----------------------------
+# Benchmark
+# -----------------------------
+def _synthetic_intervals(n, hosts, seed=0):
+    rng = np.random.default_rng(seed)
+    start = np.datetime64('2025-01-01', 'ns').view('i8') + rng.integers(0, 365 * 24 * 4, n) * 15 * NS_PER_MINUTE
+    duration = rng.choice([15, 30, 45, 60], n) * NS_PER_MINUTE
+    return pd.DataFrame({
+        'user_name': np.array([f'host_{i}' for i in range(hosts)])[rng.integers(0, hosts, n)],
+        'booking_id': np.arange(n),
+        'start': start,
+        'end': start + duration,
+    })
+
+
+def benchmark(sizes=(100_000, 1_000_000, 4_000_000), hosts=300):
+    for n in sizes:
+        intervals = _synthetic_intervals(n, hosts)
+        t0 = time.perf_counter()
+        summary = load_summary(intervals)
+        t1 = time.perf_counter()
+        per_slot = load_by_slot(intervals, '1h')
+        t2 = time.perf_counter()
+        print(f"n={n:>9,} hosts={hosts}: load_summary {t1 - t0:.2f}s, "
+              f"load_by_slot(1h) {t2 - t1:.2f}s ({len(per_slot):,} slots, "
+              f"max peak {summary['peak_concurrency'].max()})")
+
+
+if __name__ == '__main__':
+    benchmark()
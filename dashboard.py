@@ -4,29 +4,42 @@
 # dashboard.py
 import streamlit as st
 import pandas as pd
+import numpy as np
 import matplotlib.pyplot as plt
 import seaborn as sns
 import matplotlib.dates as mdates
 import json
+import time
+import sketches
+import capacity
+import search
+import timebuckets
+from datastore import SharedDataset, DEFAULT_REFRESH_SECONDS
 
 # -----------------------------
 # CONFIG: Load exported data
 # -----------------------------
-DATA_PATH = "all_calendly_invites.csv"  # Replace with your exported CSV or Parquet
+DATA_PATH = "all_calendly_invites.csv"  # Replace with your exported CSV, Parquet file or Parquet directory
+MANIFEST_PATH = None                     # Optional JSON manifest with a "version" key
+REFRESH_SECONDS = DEFAULT_REFRESH_SECONDS
 
-# Load data
-final_df = pd.read_csv(DATA_PATH)  # or pd.read_parquet(DATA_PATH)
+# Approximate distinct counts (HyperLogLog, see sketches.py) instead of exact nunique
+APPROX_DISTINCT = False
+HLL_PRECISION = sketches.DEFAULT_PRECISION
+# Per-partition sketches written by the S3 notebook; None = build from final_df.
+# Sketch-backed tables only change when the notebook rewrites SKETCH_DIR, not
+# when the background refresher reloads DATA_PATH.
+SKETCH_DIR = None
 
-# ----------------------------
-# Canonical datetime fields
-# ----------------------------
-final_df['booking_timestamp'] = pd.to_datetime(final_df['payload.scheduled_event.start_time'])
-final_df['booking_date'] = final_df['booking_timestamp'].dt.date
-final_df['source'] = final_df['channel']
-final_df['booking_id'] = final_df['payload.scheduled_event.uri']
-final_df['employee_id'] = final_df['created_by']
-final_df['meeting_id'] = final_df['payload.uri']
-final_df['meeting_date'] = final_df['booking_timestamp']
+def count_distinct(frame, keys, id_col, name):
+    # groupby(keys).agg(name=(id_col,'nunique')), exact or via HLL sketches
+    if APPROX_DISTINCT:
+        rollup = next((r for r, spec in sketches.ROLLUPS.items() if spec == (keys, id_col)), None)
+        if SKETCH_DIR and rollup:
+            # Merge the stored partition sketches instead of rehashing every id
+            return sketches.estimate(sketches.load_rollup(SKETCH_DIR, rollup), keys, name)
+        return sketches.approx_nunique(frame, keys, id_col, name, HLL_PRECISION)
+    return frame.groupby(keys).agg(**{name: (id_col, 'nunique')}).reset_index()
 
 # -----------------------------
 # Prepare meeting / user data
@@ -44,12 +57,85 @@ def extract_user_names(memberships):
             return []
     return []
 
-final_df['user_names'] = final_df['payload.scheduled_event.event_memberships'].apply(extract_user_names)
-final_df_expanded = final_df.explode('user_names').rename(columns={'user_names': 'user_name'})
-final_df_expanded = final_df_expanded.dropna(subset=['user_name'])
-final_df_expanded['meeting_date'] = pd.to_datetime(final_df_expanded['meeting_date'])
-final_df_expanded['week'] = final_df_expanded['meeting_date'].dt.to_period('W')
-user_weekly = final_df_expanded.groupby(['user_name','week']).agg(meetings=('meeting_id','nunique')).reset_index()
+def bucket_heatmap(final_df, view):
+    # Exact counts are one bincount pass; approximate ones go through the HLL sketches
+    if not APPROX_DISTINCT:
+        return timebuckets.hour_dow_matrix(final_df, view)
+    dow, hour = f'dow_{view}', f'hour_{view}'
+    counts = count_distinct(final_df, [dow, hour], 'booking_id', 'bookings')
+    counts = counts[(counts[dow] >= 0) & (counts[hour] >= 0)]
+    matrix = np.zeros((7, 24), dtype=np.int64)
+    matrix[counts[dow], counts[hour]] = counts['bookings']
+    return pd.DataFrame(matrix, index=timebuckets.WEEKDAYS, columns=timebuckets.HOURS)
+
+# -----------------------------
+# Prepare frames + aggregates (runs once per data version, off the request path)
+# -----------------------------
+def prepare_data(final_df, version):
+    # Canonical datetime fields
+    final_df['booking_timestamp'] = pd.to_datetime(final_df['payload.scheduled_event.start_time'])
+    final_df['booking_date'] = final_df['booking_timestamp'].dt.date
+    final_df['source'] = final_df['channel']
+    final_df['booking_id'] = final_df['payload.scheduled_event.uri']
+    final_df['employee_id'] = final_df['created_by']
+    final_df['meeting_id'] = final_df['payload.uri']
+    final_df['meeting_date'] = final_df['booking_timestamp']
+
+    # Hour / day of week, in UTC and in the invitee's own timezone (int8)
+    timebuckets.add_time_buckets(final_df)
+
+    # Meeting / user data
+    final_df['user_names'] = final_df['payload.scheduled_event.event_memberships'].apply(extract_user_names)
+    final_df_expanded = final_df.explode('user_names').rename(columns={'user_names': 'user_name'})
+    final_df_expanded = final_df_expanded.dropna(subset=['user_name'])
+    final_df_expanded['meeting_date'] = pd.to_datetime(final_df_expanded['meeting_date'])
+    final_df_expanded['week'] = final_df_expanded['meeting_date'].dt.to_period('W')
+
+    channel_kpis = final_df.groupby('channel').agg(
+        total_bookings=('booking_id','nunique'),
+        total_spend=('spend','sum')
+    ).reset_index()
+    channel_kpis['cpb'] = channel_kpis['total_spend'] / channel_kpis['total_bookings']
+
+    intervals = capacity.meeting_intervals(final_df_expanded)
+
+    frames = {
+        'final_df': final_df,
+        'final_df_expanded': final_df_expanded,
+        'user_weekly': count_distinct(final_df_expanded, ['user_name','week'], 'meeting_id', 'meetings'),
+        'trend_df': count_distinct(final_df, ['booking_date','source'], 'booking_id', 'bookings'),
+        'channel_kpis': channel_kpis,
+        'meeting_intervals': intervals,
+        'load_summary': capacity.load_summary(intervals),
+        'invitee_index': search.load_or_build(final_df, DATA_PATH, version),
+    }
+    for view in ('local', 'utc'):
+        frames[f'time_heatmap_{view}'] = bucket_heatmap(final_df, view)
+        frames[f'hour_counts_{view}'] = timebuckets.hour_counts(final_df, view)
+        frames[f'dow_counts_{view}'] = timebuckets.dow_counts(final_df, view)
+
+    if APPROX_DISTINCT:
+        booking_rollups = {k: v for k, v in sketches.ROLLUPS.items() if v[1] == 'booking_id'}
+        meeting_rollups = {k: v for k, v in sketches.ROLLUPS.items() if v[1] == 'meeting_id'}
+        frames['hll_accuracy'] = pd.concat([
+            sketches.accuracy_report(final_df, HLL_PRECISION, booking_rollups, SKETCH_DIR),
+            sketches.accuracy_report(final_df_expanded, HLL_PRECISION, meeting_rollups, SKETCH_DIR),
+        ], ignore_index=True)
+    return frames
+
+# One prepared dataset per process, shared read-only by every session and
+# swapped in by the background refresher when DATA_PATH changes. Stop the
+# refresher when the cached resource is released ("Clear cache", a code
+# edit), or its thread would keep rebuilding a second copy of the data.
+@st.cache_resource(on_release=lambda dataset: dataset.stop())
+def get_dataset():
+    return SharedDataset(DATA_PATH, prepare_data, REFRESH_SECONDS, MANIFEST_PATH).start()
+
+@st.cache_data(max_entries=16)
+def slot_load(version, freq, _intervals):
+    # Keyed on the data version; _intervals (unhashed) must come from the
+    # same snapshot the session is rendering, not get_dataset().current
+    return capacity.load_by_slot(_intervals, freq)
 
 # -----------------------------
 # Streamlit app
@@ -57,13 +143,19 @@ user_weekly = final_df_expanded.groupby(['user_name','week']).agg(meetings=('mee
 st.set_page_config(layout="wide", page_title="Calendly Analytics Dashboard")
 st.title("Calendly Analytics Dashboard")
 
+data = get_dataset().current
+final_df = data['final_df']
+user_weekly = data['user_weekly']
+st.caption(f"Data loaded {time.strftime('%Y-%m-%d %H:%M:%S', time.localtime(data.loaded_at))}")
+
 tabs = st.tabs([
     "1.1 Daily Calls Booked by Channel",
     "1.2 Cost Per Booking (CPB) by Channel",
     "1.3 Bookings Trend Over Time",
     "1.4 Channel Leaderboard",
     "1.5 Booking Volume by Time / Day",
-    "1.6 Meeting Load per Employee"
+    "1.6 Meeting Load per Employee",
+    "1.7 Invitee Search"
 ])
 
 # -----------------------------
@@ -73,8 +165,8 @@ with tabs[0]:
     st.header("Daily Calls Booked by Channel")
     sources = st.multiselect("Select Channels", options=final_df['source'].dropna().unique(),
                              default=final_df['source'].dropna().unique())
-    daily_bookings = final_df[final_df['source'].isin(sources)].groupby(['booking_date','source']).agg(
-        bookings=('booking_id','nunique')).reset_index()
+    trend_df = data['trend_df']
+    daily_bookings = trend_df[trend_df['source'].isin(sources)]
 
     plt.figure(figsize=(12,6))
     for src in daily_bookings['source'].unique():
@@ -92,11 +184,7 @@ with tabs[0]:
 # -----------------------------
 with tabs[1]:
     st.header("Cost Per Booking by Channel")
-    cpb_df = final_df.groupby('channel').agg(
-        total_spend=('spend','sum'),
-        total_bookings=('booking_id','nunique')
-    ).reset_index()
-    cpb_df['cpb'] = cpb_df['total_spend'] / cpb_df['total_bookings']
+    cpb_df = data['channel_kpis']
 
     plt.figure(figsize=(10,6))
     plt.bar(cpb_df['channel'], cpb_df['cpb'])
@@ -110,7 +198,7 @@ with tabs[1]:
 # -----------------------------
 with tabs[2]:
     st.header("Bookings Trend Over Time by Channel")
-    trend_df = final_df.groupby(['booking_date','source']).agg(bookings=('booking_id','nunique')).reset_index()
+    trend_df = data['trend_df']
 
     # Line chart per channel
     plt.figure(figsize=(12,6))
@@ -143,12 +231,7 @@ with tabs[2]:
 # -----------------------------
 with tabs[3]:
     st.header("Channel Leaderboard")
-    leaderboard = final_df.groupby('channel').agg(
-        total_bookings=('booking_id','nunique'),
-        total_spend=('spend','sum')
-    ).reset_index()
-    leaderboard['cpb'] = leaderboard['total_spend'] / leaderboard['total_bookings']
-    leaderboard_sorted = leaderboard.sort_values('total_bookings', ascending=False)
+    leaderboard_sorted = data['channel_kpis'].sort_values('total_bookings', ascending=False)
 
     plt.figure(figsize=(10,6))
     plt.bar(leaderboard_sorted['channel'], leaderboard_sorted['total_bookings'])
@@ -164,13 +247,11 @@ with tabs[3]:
 # -----------------------------
 with tabs[4]:
     st.header("Booking Volume by Hour and Day of Week")
-    final_df['hour'] = final_df['booking_timestamp'].dt.hour
-    final_df['day_of_week'] = final_df['booking_timestamp'].dt.day_name()
-    weekday_order = ['Monday','Tuesday','Wednesday','Thursday','Friday','Saturday','Sunday']
-    final_df['day_of_week'] = pd.Categorical(final_df['day_of_week'], categories=weekday_order, ordered=True)
+    tz_view = st.radio("Time zone", ["Invitee local", "UTC"], horizontal=True)
+    view = 'local' if tz_view == "Invitee local" else 'utc'
 
     # Heatmap
-    time_heatmap = final_df.groupby(['day_of_week','hour']).agg(bookings=('booking_id','nunique')).unstack(fill_value=0)['bookings']
+    time_heatmap = data[f'time_heatmap_{view}']
     plt.figure(figsize=(12,6))
     plt.imshow(time_heatmap, aspect='auto', cmap='viridis')
     plt.colorbar(label='Bookings')
@@ -183,14 +264,15 @@ with tabs[4]:
 
     # Histogram
     plt.figure(figsize=(12,6))
-    plt.hist(final_df['hour'], bins=24)
+    plt.bar(timebuckets.HOURS, data[f'hour_counts_{view}'], width=1.0)
     plt.xlabel("Hour")
     plt.ylabel("Bookings")
     plt.title("Bookings by Hour")
     st.pyplot(plt.gcf())
 
     # Pie chart
-    dow_counts = final_df['day_of_week'].value_counts()
+    dow_counts = data[f'dow_counts_{view}']
+    dow_counts = dow_counts[dow_counts > 0]
     plt.figure(figsize=(8,8))
     plt.pie(dow_counts, labels=dow_counts.index, autopct='%1.1f%%')
     plt.title("Bookings by Day of Week")
@@ -233,3 +315,58 @@ with tabs[5]:
     plt.legend(title='User', bbox_to_anchor=(1.05,1), loc='upper left')
     st.pyplot(plt.gcf())
 
+    st.subheader("Concurrent Load & Capacity")
+    load_summary = data['load_summary']
+    st.dataframe(load_summary[load_summary['user_name'].isin(users)])
+
+    freq = st.selectbox("Slot size", ['30min', '1h', '4h', '1D'], index=1)
+    per_slot = slot_load(data.version, freq, data['meeting_intervals'])
+    per_slot = per_slot[per_slot['user_name'].isin(users)]
+    busy_grid = per_slot.pivot_table(index='user_name', columns='slot', values='busy_minutes', fill_value=0)
+    plt.figure(figsize=(20,10))
+    plt.imshow(busy_grid, aspect='auto', cmap='viridis')
+    plt.colorbar(label='Busy minutes')
+    plt.yticks(range(len(busy_grid.index)), busy_grid.index)
+    plt.xlabel(f"Slot ({freq}, UTC)")
+    plt.title("Busy Minutes per Slot")
+    st.pyplot(plt.gcf())
+
+# -----------------------------
+# 1.7 Invitee Search
+# -----------------------------
+with tabs[6]:
+    st.header("Invitee Search")
+    invitee_index = data['invitee_index']
+    search_by = st.selectbox("Search by", ["Answer text", "Email", "Phone"])
+    query = st.text_input("Query")
+
+    if query:
+        start = time.perf_counter()
+        if search_by == "Email":
+            rows = invitee_index.by_email(query)
+        elif search_by == "Phone":
+            rows = invitee_index.by_phone(query)
+        else:
+            rows = invitee_index.by_answer(query)
+        elapsed_ms = (time.perf_counter() - start) * 1000
+
+        st.caption(f"{len(rows)} matching invitees in {elapsed_ms:.1f} ms")
+        result_cols = ['payload.name', 'payload.email', 'payload.text_reminder_number', 'payload.timezone',
+                       'payload.scheduled_event.name', 'payload.scheduled_event.start_time']
+        st.dataframe(final_df.iloc[rows[:1000]][[c for c in result_cols if c in final_df]])
+
+        qa = invitee_index.qa
+        st.subheader("Questions & Answers")
+        st.dataframe(qa[qa['row'].isin(rows[:1000])])
+
+# -----------------------------
+# HLL accuracy report
+# -----------------------------
+if APPROX_DISTINCT:
+    hll_accuracy = data['hll_accuracy']
+    # Stored sketches keep the precision the notebook wrote them with
+    precisions = sorted(int(p) for p in hll_accuracy['precision'].unique())
+    with st.expander(f"Distinct-count accuracy (HyperLogLog, precision={', '.join(map(str, precisions))})"):
+        if precisions != [HLL_PRECISION]:
+            st.warning(f"Stored sketches in {SKETCH_DIR} use precision {precisions}, not HLL_PRECISION={HLL_PRECISION}")
+        st.dataframe(hll_accuracy)
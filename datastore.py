@@ -0,0 +1,111 @@
+# datastore.py
+# Process-wide, read-only prepared dataset shared by every dashboard session.
+#
+# The dashboard holds a single SharedDataset (via st.cache_resource). A
+# daemon thread polls the data source and, when it changes, loads and
+# prepares a fresh Snapshot off the request path, then swaps it in with a
+# single attribute assignment. Sessions only ever read `current`, so they
+# never block on a reload and never see a half-built snapshot.
+import glob
+import json
+import logging
+import os
+import threading
+import time
+from dataclasses import dataclass, field
+
+import pandas as pd
+
+logger = logging.getLogger(__name__)
+
+# -----------------------------
+# CONFIG
+# -----------------------------
+DEFAULT_REFRESH_SECONDS = 60
+
+
+@dataclass(frozen=True)
+class Snapshot:
+    version: object
+    loaded_at: float
+    frames: dict = field(default_factory=dict)
+
+    def __getitem__(self, name):
+        return self.frames[name]
+
+
+# -----------------------------
+# Loading + change detection
+# -----------------------------
+def load_data(path):
+    """Read the exported dataset: a CSV, a Parquet file or a Parquet directory."""
+    if os.path.isdir(path) or path.endswith(".parquet"):
+        return pd.read_parquet(path)
+    return pd.read_csv(path)
+
+
+def source_version(path, manifest_path=None):
+    """Cheap fingerprint of the data source; changes when new data lands.
+
+    A manifest (JSON with a "version" key) wins when given; otherwise a
+    directory is fingerprinted by its Parquet partitions and a file by mtime.
+    """
+    if manifest_path:
+        with open(manifest_path) as f:
+            return json.load(f)["version"]
+    if os.path.isdir(path):
+        parts = glob.glob(os.path.join(path, "**", "*.parquet"), recursive=True)
+        return tuple(sorted((p, os.path.getmtime(p)) for p in parts))
+    return os.path.getmtime(path)
+
+
+# -----------------------------
+# Shared dataset
+# -----------------------------
+class SharedDataset:
+    def __init__(self, path, prepare, refresh_seconds=DEFAULT_REFRESH_SECONDS, manifest_path=None):
+        self.path = path
+        self.prepare = prepare              # (raw DataFrame, version) -> dict of prepared frames
+        self.refresh_seconds = refresh_seconds
+        self.manifest_path = manifest_path
+        self._thread = None
+        self._stop = threading.Event()
+        # First load happens synchronously so `current` is never empty
+        self.current = self._build(source_version(path, manifest_path))
+
+    def _build(self, version):
+        # `version` is read before the load, so if the source changes mid-load
+        # the next refresh sees a newer version and rebuilds
+        frames = self.prepare(load_data(self.path), version)
+        return Snapshot(version=version, loaded_at=time.time(), frames=frames)
+
+    def refresh(self):
+        """Rebuild and swap in a new snapshot if the source changed."""
+        version = source_version(self.path, self.manifest_path)
+        if self.current is None or version == self.current.version:
+            return False
+        snapshot = self._build(version)
+        if self._stop.is_set():
+            return False   # stopped mid-build: don't resurrect a released dataset
+        self.current = snapshot   # atomic swap
+        logger.info("Reloaded %s (version %s)", self.path, version)
+        return True
+
+    def _run(self):
+        while not self._stop.wait(self.refresh_seconds):
+            try:
+                self.refresh()
+            except Exception:
+                # Keep serving the last good snapshot; retry next interval
+                logger.exception("Background refresh of %s failed", self.path)
+
+    def start(self):
+        if self._thread is None or not self._thread.is_alive():
+            self._thread = threading.Thread(target=self._run, name="dataset-refresher", daemon=True)
+            self._thread.start()
+        return self
+
+    def stop(self):
+        """Stop the refresher and drop the snapshot; sessions mid-render keep their own reference."""
+        self._stop.set()
+        self.current = None
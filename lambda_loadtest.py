@@ -0,0 +1,323 @@
+# lambda_loadtest.py
+# Local load-testing / latency harness for the webhook Lambda handler.
+#
+# Loads `3.lambda function.txt` the way Lambda would (module-level code
+# runs once per container), swaps its S3 client for an in-memory fake with
+# configurable put_object latency, and replays webhook bodies against
+# lambda_handler at a given concurrency. Reports cold vs. warm latency
+# distributions and throughput, and exits non-zero on regressions
+# against a saved baseline.
+#
+#   python lambda_loadtest.py --requests 5000 --concurrency 32
+#   python lambda_loadtest.py --save-baseline lambda_baseline.json
+#   python lambda_loadtest.py --baseline lambda_baseline.json
+import argparse
+import importlib.util
+import json
+import os
+import random
+import subprocess
+import sys
+import threading
+import time
+import types
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+
+# -----------------------------
+# CONFIG
+# -----------------------------
+HANDLER_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), "3.lambda function.txt")
+DEFAULT_TOLERANCE = 0.20   # allowed regression vs. baseline (20%)
+
+
+# -----------------------------
+# Fake S3
+# -----------------------------
+class FakeS3:
+    """In-memory stand-in for boto3's S3 client (put_object only)."""
+
+    def __init__(self, latency_ms=0.0, jitter_ms=0.0, seed=0):
+        self.latency_ms = latency_ms
+        self.jitter_ms = jitter_ms
+        self.objects = {}
+        self._lock = threading.Lock()
+        self._rng = random.Random(seed)
+
+    def put_object(self, Bucket, Key, Body, ContentType=None):
+        if self.latency_ms or self.jitter_ms:
+            with self._lock:
+                delay = max(0.0, self._rng.gauss(self.latency_ms, self.jitter_ms))
+            time.sleep(delay / 1000)
+        with self._lock:
+            self.objects[(Bucket, Key)] = Body
+        return {"ETag": uuid.uuid4().hex}
+
+
+def boto3_mode(use_real_boto3):
+    """'real' if the handler will import the installed boto3, else 'fake'."""
+    if use_real_boto3 and importlib.util.find_spec("boto3") is not None:
+        return "real"
+    return "fake"
+
+
+def _fake_boto3():
+    module = types.ModuleType("boto3")
+    module.client = lambda service, **kwargs: FakeS3()
+    return module
+
+
+# -----------------------------
+# Handler loading (= cold start)
+# -----------------------------
+def load_handler(path=HANDLER_PATH, use_real_boto3=True):
+    """Execute the handler source in a fresh module namespace.
+
+    With boto3 installed this includes the real `import boto3` and
+    `boto3.client("s3")`, which is what dominates a Lambda cold start.
+    Returns (module, seconds spent executing module-level code).
+    """
+    with open(path) as f:
+        source = f.read()
+
+    inject = boto3_mode(use_real_boto3) == "fake"
+    saved = sys.modules.get("boto3")
+    if inject:
+        sys.modules["boto3"] = _fake_boto3()
+
+    module = types.ModuleType("lambda_function")
+    try:
+        start = time.perf_counter()
+        exec(compile(source, path, "exec"), module.__dict__)
+        elapsed = time.perf_counter() - start
+    finally:
+        if inject and saved is not None:
+            sys.modules["boto3"] = saved
+        elif inject:
+            del sys.modules["boto3"]
+    return module, elapsed
+
+
+# -----------------------------
+# Webhook bodies
+# -----------------------------
+def synthetic_bodies(n, malformed_ratio=0.05, seed=0):
+    rng = random.Random(seed)
+    bodies = []
+    for i in range(n):
+        if rng.random() < malformed_ratio:
+            bodies.append(f"not-json-{i}{{")
+            continue
+        bodies.append(json.dumps({
+            "created_at": "2025-12-14T07:27:44.791505Z",
+            "event": "invitee.created",
+            "payload": {
+                "email": f"invitee{i}@example.com",
+                "name": f"Invitee {i}",
+                "questions_and_answers": [{"answer": "check in", "position": 0,
+                                           "question": "Anything to prepare?"}],
+                "scheduled_event": {
+                    "start_time": "2026-01-07T15:45:00.000000Z",
+                    "end_time": "2026-01-07T16:00:00.000000Z",
+                    "uri": f"https://api.calendly.com/scheduled_events/{i}",
+                },
+                "timezone": "America/New_York",
+            },
+        }))
+    return bodies
+
+
+def recorded_bodies(path):
+    """One webhook body per line; JSON lines are replayed re-serialized, anything else verbatim."""
+    bodies = []
+    with open(path) as f:
+        for line in f:
+            line = line.rstrip("\n")
+            if not line:
+                continue
+            try:
+                bodies.append(json.dumps(json.loads(line)))
+            except ValueError:
+                bodies.append(line)
+    return bodies
+
+
+# -----------------------------
+# Measurement
+# -----------------------------
+def percentiles(samples_ms):
+    ordered = sorted(samples_ms)
+    if not ordered:
+        return {}
+
+    def pick(q):
+        return ordered[min(len(ordered) - 1, int(q * len(ordered)))]
+
+    return {
+        "n": len(ordered),
+        "p50_ms": pick(0.50),
+        "p90_ms": pick(0.90),
+        "p99_ms": pick(0.99),
+        "max_ms": ordered[-1],
+    }
+
+
+def _invoke(handler, body):
+    start = time.perf_counter()
+    response = handler({"body": body}, None)
+    return (time.perf_counter() - start) * 1000, response
+
+
+def cold_probe(s3_latency_ms, use_real_boto3):
+    """One cold start: module load + first invocation (run in a fresh process)."""
+    module, init_s = load_handler(use_real_boto3=use_real_boto3)
+    module.s3 = FakeS3(latency_ms=s3_latency_ms)
+    elapsed_ms, _ = _invoke(module.lambda_handler, synthetic_bodies(1, malformed_ratio=0)[0])
+    return {"init_ms": init_s * 1000, "first_request_ms": init_s * 1000 + elapsed_ms}
+
+
+def cold_starts(samples, s3_latency_ms, use_real_boto3):
+    # Each sample is a new interpreter so module imports are paid again,
+    # like a new Lambda container; interpreter startup itself is excluded.
+    init_ms, first_ms = [], []
+    cmd = [sys.executable, os.path.abspath(__file__), "--cold-probe", "--s3-latency-ms", str(s3_latency_ms)]
+    if not use_real_boto3:
+        cmd.append("--fake-boto3")
+    for _ in range(samples):
+        out = subprocess.run(cmd, capture_output=True, text=True, check=True)
+        probe = json.loads(out.stdout)
+        init_ms.append(probe["init_ms"])
+        first_ms.append(probe["first_request_ms"])
+    return {"init": percentiles(init_ms), "first_request": percentiles(first_ms)}
+
+
+def warm_run(bodies, concurrency, s3_latency_ms, s3_jitter_ms, use_real_boto3):
+    module, _ = load_handler(use_real_boto3=use_real_boto3)
+    fake = FakeS3(latency_ms=s3_latency_ms, jitter_ms=s3_jitter_ms)
+    module.s3 = fake
+    _invoke(module.lambda_handler, bodies[0])   # warm-up, not measured
+    fake.objects.clear()
+
+    start = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=concurrency) as pool:
+        results = list(pool.map(lambda b: _invoke(module.lambda_handler, b), bodies))
+    wall = time.perf_counter() - start
+
+    latencies = [ms for ms, _ in results]
+    errors = sum(1 for _, r in results if r.get("statusCode") != 200)
+    stored = [json.loads(body) for body in fake.objects.values()]
+    raw_bodies = sum(1 for payload in stored if isinstance(payload, dict) and "raw_body" in payload)
+    return {
+        "latency": percentiles(latencies),
+        "throughput_rps": len(bodies) / wall,
+        "errors": errors,
+        "stored": len(fake.objects),
+        "raw_body_stored": raw_bodies,
+    }
+
+
+# -----------------------------
+# Regression check
+# -----------------------------
+def regressions(report, baseline, tolerance=DEFAULT_TOLERANCE):
+    failures = []
+    checks = [
+        ("cold init p50", report["cold"]["init"]["p50_ms"], baseline["cold"]["init"]["p50_ms"], True),
+        ("warm p50", report["warm"]["latency"]["p50_ms"], baseline["warm"]["latency"]["p50_ms"], True),
+        ("warm p99", report["warm"]["latency"]["p99_ms"], baseline["warm"]["latency"]["p99_ms"], True),
+        ("throughput", report["warm"]["throughput_rps"], baseline["warm"]["throughput_rps"], False),
+    ]
+    for name, value, ref, lower_is_better in checks:
+        limit = ref * (1 + tolerance) if lower_is_better else ref * (1 - tolerance)
+        if (value > limit) if lower_is_better else (value < limit):
+            failures.append(f"{name}: {value:.3f} vs baseline {ref:.3f} (limit {limit:.3f})")
+    return failures
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(
+        description="Replay webhook bodies against the Lambda handler with a fake S3 and "
+                    "report cold/warm latency and throughput.")
+    parser.add_argument("--bodies", help="file with one recorded webhook body per line (default: synthetic)")
+    parser.add_argument("--requests", type=int, default=2000)
+    parser.add_argument("--concurrency", type=int, default=16)
+    parser.add_argument("--cold-samples", type=int, default=20)
+    parser.add_argument("--malformed-ratio", type=float, default=0.05)
+    parser.add_argument("--s3-latency-ms", type=float, default=20.0)
+    parser.add_argument("--s3-jitter-ms", type=float, default=5.0)
+    parser.add_argument("--fake-boto3", action="store_true", help="don't import real boto3 for cold starts")
+    parser.add_argument("--baseline", help="fail if results regress against this JSON report")
+    parser.add_argument("--tolerance", type=float, default=DEFAULT_TOLERANCE)
+    parser.add_argument("--save-baseline", help="write this run's report as a baseline")
+    parser.add_argument("--cold-probe", action="store_true", help=argparse.SUPPRESS)
+    args = parser.parse_args(argv)
+
+    use_real_boto3 = not args.fake_boto3
+    if args.cold_probe:
+        print(json.dumps(cold_probe(args.s3_latency_ms, use_real_boto3)))
+        return 0
+
+    if args.requests < 1:
+        parser.error("--requests must be at least 1")
+    if args.bodies:
+        bodies = recorded_bodies(args.bodies)
+        if not bodies:
+            parser.error(f"--bodies file {args.bodies} has no webhook bodies")
+        bodies = (bodies * (args.requests // len(bodies) + 1))[:args.requests]
+    else:
+        bodies = synthetic_bodies(args.requests, args.malformed_ratio)
+
+    # Record the mode actually used: without boto3 installed, "real" silently
+    # becomes the fake and cold starts no longer include boto3 import/client setup
+    mode = boto3_mode(use_real_boto3)
+    if use_real_boto3 and mode == "fake":
+        print("WARNING: boto3 is not installed; cold starts use a fake boto3 and "
+              "exclude boto3 import and client creation", file=sys.stderr)
+
+    baseline = None
+    if args.baseline:
+        with open(args.baseline) as f:
+            baseline = json.load(f)
+        baseline_mode = baseline.get("config", {}).get("boto3")
+        if baseline_mode != mode:
+            parser.error(f"baseline {args.baseline} was recorded with boto3={baseline_mode}, "
+                         f"this run uses boto3={mode}; results are not comparable")
+
+    report = {
+        "cold": cold_starts(args.cold_samples, args.s3_latency_ms, use_real_boto3),
+        "warm": warm_run(bodies, args.concurrency, args.s3_latency_ms, args.s3_jitter_ms, use_real_boto3),
+        "config": {k: v for k, v in vars(args).items() if k not in ("baseline", "save_baseline", "cold_probe")},
+    }
+    report["config"]["boto3"] = mode
+    report["config"]["fake_boto3"] = mode == "fake"
+    print(json.dumps(report, indent=2))
+
+    # Every malformed body must go down the raw_body path, and nothing else
+    expected_raw = sum(1 for b in bodies if not _is_json(b))
+    failures = []
+    if report["warm"]["errors"]:
+        failures.append(f"{report['warm']['errors']} non-200 responses")
+    if report["warm"]["raw_body_stored"] != expected_raw:
+        failures.append(f"raw_body stored {report['warm']['raw_body_stored']} times, expected {expected_raw}")
+
+    if args.save_baseline:
+        with open(args.save_baseline, "w") as f:
+            json.dump(report, f, indent=2)
+    if baseline is not None:
+        failures += regressions(report, baseline, args.tolerance)
+
+    for failure in failures:
+        print(f"FAIL {failure}", file=sys.stderr)
+    return 1 if failures else 0
+
+
+def _is_json(body):
+    try:
+        json.loads(body)
+        return True
+    except ValueError:
+        return False
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,194 @@
+# search.py
+# Indexed invitee search over questions_and_answers and contact fields.
+#
+# payload.questions_and_answers is stored as a Python-repr string in the
+# CSV (a JSON string after a backfill), so finding invitees by an answer,
+# email or phone used to mean scanning every row. This stage parses the
+# Q&A into a normalized table and builds sorted-array indexes:
+#   - inverted index  token -> invitee rows (answer text)
+#   - exact indexes   normalized email / phone -> invitee rows
+# Lookups are a binary search (np.searchsorted) plus a slice, so they stay
+# in the millisecond range over millions of invitees. The indexes are
+# persisted as Parquet next to the dataset with a fingerprint of the data
+# source, and rebuilt when the fingerprint no longer matches.
+import ast
+import json
+import os
+from itertools import chain
+
+import numpy as np
+import pandas as pd
+
+# -----------------------------
+# CONFIG
+# -----------------------------
+QA_COL = 'payload.questions_and_answers'
+EMAIL_COL = 'payload.email'
+PHONE_COL = 'payload.text_reminder_number'
+TOKEN_PATTERN = r'[\w@.+-]*\w[\w@.+-]*'
+PHONE_PATTERN = r'^\+?[\d\s().-]{7,}$'
+MIN_PHONE_DIGITS = 7
+
+
+# -----------------------------
+# Parsing / normalization
+# -----------------------------
+def parse_qa(value):
+    """List of {question, answer, position} dicts from any stored form."""
+    if isinstance(value, list):
+        return value
+    if not isinstance(value, str) or not value:
+        return []
+    try:
+        return json.loads(value)
+    except ValueError:
+        pass
+    try:
+        return ast.literal_eval(value)
+    except (ValueError, SyntaxError):
+        return []
+
+
+def qa_table(final_df):
+    """Normalized Q&A: one row per (invitee row, answer)."""
+    raw = final_df[QA_COL] if QA_COL in final_df else pd.Series(dtype=object)
+    # Many invitees share the same Q&A string; parse each distinct one once
+    uniques = raw.dropna().astype(str).unique()
+    parsed = dict(zip(uniques, map(parse_qa, uniques)))
+    lists = raw.astype(str).map(parsed).where(raw.notna(), None)
+
+    exploded = lists.reset_index(drop=True).explode().dropna()
+    exploded = exploded[exploded.map(lambda qa: isinstance(qa, dict))]
+    table = pd.DataFrame(exploded.tolist(), columns=['question', 'answer', 'position'])
+    table.insert(0, 'row', exploded.index.to_numpy(dtype=np.int64))
+    # Explicit dtypes, so a dataset with no answers at all still indexes
+    return table.astype({'row': np.int64, 'question': 'string', 'answer': 'string'})
+
+
+def normalize_email(values):
+    return pd.Series(values, dtype='string').str.strip().str.lower()
+
+
+def normalize_phone(values):
+    # Digits only, so '+1 347-925-2457' and '13479252457' match
+    return pd.Series(values, dtype='string').str.replace(r'\D', '', regex=True)
+
+
+# -----------------------------
+# Sorted-array indexes
+# -----------------------------
+def _postings(keys, rows):
+    """(key, row) pairs, deduplicated and sorted by key then row."""
+    frame = pd.DataFrame({'key': pd.array(np.asarray(keys, dtype=object), dtype='string'),
+                          'row': np.asarray(rows, dtype=np.int64)}).dropna()
+    frame = frame[frame['key'] != '']
+    return frame.drop_duplicates().sort_values(['key', 'row'], ignore_index=True)
+
+
+def build_indexes(final_df):
+    qa = qa_table(final_df)
+
+    token_lists = qa['answer'].str.lower().str.findall(TOKEN_PATTERN).map(lambda t: t if isinstance(t, list) else [])
+    token_rows = np.repeat(qa['row'].to_numpy(dtype=np.int64), token_lists.map(len).to_numpy(dtype=np.int64))
+    token_keys = list(chain.from_iterable(token_lists))
+
+    rows = np.arange(len(final_df), dtype=np.int64)
+    email_col = final_df[EMAIL_COL] if EMAIL_COL in final_df else pd.Series(pd.NA, index=final_df.index)
+    phone_col = final_df[PHONE_COL] if PHONE_COL in final_df else pd.Series(pd.NA, index=final_df.index)
+
+    # Phones also show up as Q&A answers ("What is your phone number?")
+    phone_answers = qa[qa['answer'].str.match(PHONE_PATTERN, na=False)]
+    phones = pd.concat([normalize_phone(phone_col.to_numpy()), normalize_phone(phone_answers['answer'].to_numpy())],
+                       ignore_index=True)
+    phone_rows = np.concatenate([rows, phone_answers['row'].to_numpy(dtype=np.int64)])
+    phone_ok = phones.str.len() >= MIN_PHONE_DIGITS
+
+    return {
+        'qa': qa,
+        'tokens': _postings(token_keys, token_rows),
+        'email': _postings(normalize_email(email_col.to_numpy()), rows),
+        'phone': _postings(phones[phone_ok.fillna(False)], phone_rows[phone_ok.fillna(False).to_numpy()]),
+    }
+
+
+class InviteeIndex:
+    def __init__(self, indexes):
+        self.qa = indexes['qa']
+        self._keys, self._rows = {}, {}
+        for name in ('tokens', 'email', 'phone'):
+            postings = indexes[name]
+            self._keys[name] = postings['key'].to_numpy(dtype=object)
+            self._rows[name] = postings['row'].to_numpy(dtype=np.int64)
+
+    def _lookup(self, name, key):
+        keys = self._keys[name]
+        lo = np.searchsorted(keys, key, side='left')
+        hi = np.searchsorted(keys, key, side='right')
+        return self._rows[name][lo:hi]
+
+    def by_email(self, email):
+        return self._lookup('email', normalize_email([email]).iloc[0])
+
+    def by_phone(self, phone):
+        return self._lookup('phone', normalize_phone([phone]).iloc[0])
+
+    def by_answer(self, text):
+        """Rows whose Q&A answers contain every token of `text`."""
+        terms = pd.Series([text], dtype='string').str.lower().str.findall(TOKEN_PATTERN).iloc[0]
+        if not terms:
+            return np.array([], dtype=np.int64)
+        result = self._lookup('tokens', terms[0])
+        for term in terms[1:]:
+            result = np.intersect1d(result, self._lookup('tokens', term), assume_unique=True)
+        return result
+
+
+# -----------------------------
+# Persistence alongside the dataset
+# -----------------------------
+def index_dir_for(data_path):
+    return os.path.splitext(data_path.rstrip('/'))[0] + '_search_index'
+
+
+def save_indexes(indexes, directory):
+    os.makedirs(directory, exist_ok=True)
+    for name, frame in indexes.items():
+        frame.to_parquet(os.path.join(directory, f'{name}.parquet'), index=False)
+
+
+def load_indexes(directory):
+    return {name: pd.read_parquet(os.path.join(directory, f'{name}.parquet'))
+            for name in ('qa', 'tokens', 'email', 'phone')}
+
+
+def _fingerprint(final_df, version):
+    # `version` is the datastore.source_version the rows were loaded under,
+    # taken before the load: re-reading it here could pair a rewritten
+    # file's version with the old rows. The row count guards the
+    # row-position postings themselves.
+    fingerprint = {'version': version, 'rows': len(final_df)}
+    return json.loads(json.dumps(fingerprint))   # tuples -> lists, as stored
+
+
+def load_or_build(final_df, data_path, version):
+    """Load the persisted index if its fingerprint matches the data, else rebuild and save it."""
+    directory = index_dir_for(data_path)
+    fingerprint_path = os.path.join(directory, 'fingerprint.json')
+    fingerprint = _fingerprint(final_df, version)
+
+    if os.path.exists(fingerprint_path):
+        with open(fingerprint_path) as f:
+            if json.load(f) == fingerprint:
+                return InviteeIndex(load_indexes(directory))
+
+    indexes = build_indexes(final_df)
+    try:
+        # Drop the old fingerprint first so a half-written index is never reused
+        if os.path.exists(fingerprint_path):
+            os.remove(fingerprint_path)
+        save_indexes(indexes, directory)
+        with open(fingerprint_path, 'w') as f:
+            json.dump(fingerprint, f)
+    except OSError:
+        pass   # read-only deployments just keep the in-memory index
+    return InviteeIndex(indexes)
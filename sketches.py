@@ -0,0 +1,219 @@
+# sketches.py
+# HyperLogLog distinct-count sketches for the booking / meeting KPIs.
+#
+# groupby(...).agg(('booking_id','nunique')) keeps an exact hash set per
+# group, which can't be merged across partitions or incremental runs
+# without keeping every id. A sketch is a fixed m = 2**precision array of
+# uint8 registers per group; merging two sketches is an elementwise max,
+# so months of data can be rolled up from small stored per-partition
+# sketches.
+import glob
+import os
+
+import numpy as np
+import pandas as pd
+
+# -----------------------------
+# CONFIG
+# -----------------------------
+DEFAULT_PRECISION = 12   # m = 4096 registers, ~1.6% standard error
+MIN_PRECISION, MAX_PRECISION = 4, 18
+REGISTERS = "registers"
+PRECISION = "precision"
+PARTITION_COL = "booking_date"
+
+# Rollups used by the notebook / dashboard: name -> (group keys, id column)
+ROLLUPS = {
+    "bookings_by_date_channel": (["booking_date", "source"], "booking_id"),
+    "bookings_by_dow_hour": (["dow_local", "hour_local"], "booking_id"),
+    "meetings_by_user_week": (["user_name", "week"], "meeting_id"),
+}
+
+
+# -----------------------------
+# Hashing
+# -----------------------------
+def _bit_length(x):
+    # Vectorized int.bit_length() for uint64; float log2 can round up just
+    # below a power of two, so correct those entries afterwards.
+    bl = np.zeros(x.shape, dtype=np.int64)
+    nz = x > 0
+    bl[nz] = np.minimum(np.floor(np.log2(x[nz].astype(np.float64))).astype(np.int64) + 1, 64)
+    too_big = nz & ((np.uint64(1) << (bl - 1).clip(0).astype(np.uint64)) > x)
+    bl[too_big] -= 1
+    return bl
+
+
+def _canonical_ids(ids):
+    # hash_pandas_object hashes by dtype, so 3 (int64) and 3.0 (float64, a
+    # partition that had NaNs) would land in different registers. Hash the
+    # string form, with integral floats rendered as ints.
+    if pd.api.types.is_float_dtype(ids) and (ids.dropna() % 1 == 0).all():
+        ids = ids.astype('Int64')
+    return ids.astype(str)
+
+
+def _hash_ids(ids, precision):
+    """Return (register index, rank) arrays for a Series of ids."""
+    h = pd.util.hash_pandas_object(_canonical_ids(ids), index=False).to_numpy(dtype=np.uint64)
+    tail_bits = 64 - precision
+    idx = (h >> np.uint64(tail_bits)).astype(np.int64)
+    tail = h & np.uint64((1 << tail_bits) - 1)
+    rank = (tail_bits - _bit_length(tail) + 1).astype(np.uint8)
+    return idx, rank
+
+
+# -----------------------------
+# Build / merge / estimate
+# -----------------------------
+def build_sketches(frame, keys, id_col, precision=DEFAULT_PRECISION):
+    """One HLL sketch per group: key columns + `registers` (bytes) + `precision`."""
+    if not MIN_PRECISION <= precision <= MAX_PRECISION:
+        raise ValueError(f"precision must be between {MIN_PRECISION} and {MAX_PRECISION}, got {precision}")
+    # groupby drops NaN keys and nunique ignores NaN ids; do the same here
+    data = frame[keys + [id_col]].dropna()
+    codes, group_keys = _group_codes(data, keys)
+
+    regs = np.zeros((len(group_keys), 1 << precision), dtype=np.uint8)
+    if len(data):
+        idx, rank = _hash_ids(data[id_col], precision)
+        np.maximum.at(regs, (codes, idx), rank)
+
+    group_keys[REGISTERS] = [row.tobytes() for row in regs]
+    group_keys[PRECISION] = np.int8(precision)
+    return group_keys
+
+
+def _group_codes(frame, keys):
+    # Dense group number per row plus one row of key values per group,
+    # in the same sorted order groupby().agg() would produce.
+    codes = frame.groupby(keys, observed=True, sort=True).ngroup().to_numpy()
+    _, first = np.unique(codes, return_index=True)
+    group_keys = frame[keys].iloc[first].reset_index(drop=True)
+    return codes, group_keys
+
+
+def _precisions(sketches):
+    if PRECISION in sketches:
+        return set(sketches[PRECISION].astype(int))
+    # Sketches saved without the column: m = 2**precision registers
+    return {int(np.log2(len(b))) for b in sketches[REGISTERS]}
+
+
+def _register_matrix(sketches):
+    if not len(sketches):
+        return np.zeros((0, 0), dtype=np.uint8)
+    return np.vstack([np.frombuffer(b, dtype=np.uint8) for b in sketches[REGISTERS]])
+
+
+def merge_sketches(frames, keys):
+    """Union sketches from several partitions / runs (elementwise max per group)."""
+    precisions = set().union(*(_precisions(f) for f in frames))
+    if len(precisions) > 1:
+        raise ValueError(f"Cannot merge sketches with different precisions: {sorted(precisions)}")
+
+    stacked = pd.concat(frames, ignore_index=True)
+    regs = _register_matrix(stacked)
+    codes, group_keys = _group_codes(stacked, keys)
+
+    merged = np.zeros((len(group_keys), regs.shape[1]), dtype=np.uint8)
+    np.maximum.at(merged, codes, regs)
+
+    group_keys[REGISTERS] = [row.tobytes() for row in merged]
+    group_keys[PRECISION] = np.int8(precisions.pop()) if precisions else np.int8(DEFAULT_PRECISION)
+    return group_keys
+
+
+def estimate(sketches, keys, name="distinct"):
+    """Turn sketches into a keys + `name` frame, like groupby().agg(nunique)."""
+    regs = _register_matrix(sketches).astype(np.float64)
+    out = sketches[keys].copy()
+    if not len(regs):
+        out[name] = pd.Series(dtype=np.int64)
+        return out
+
+    m = regs.shape[1]
+    alpha = 0.7213 / (1 + 1.079 / m)
+    raw = alpha * m * m / np.power(2.0, -regs).sum(axis=1)
+
+    # Small-range correction: linear counting while registers are still empty
+    zeros = (regs == 0).sum(axis=1)
+    small = (raw <= 2.5 * m) & (zeros > 0)
+    raw[small] = m * np.log(m / zeros[small])
+
+    out[name] = np.rint(raw).astype(np.int64)
+    return out
+
+
+def approx_nunique(frame, keys, id_col, name, precision=DEFAULT_PRECISION):
+    """Drop-in for frame.groupby(keys).agg(name=(id_col,'nunique')).reset_index()."""
+    return estimate(build_sketches(frame, keys, id_col, precision), keys, name)
+
+
+# -----------------------------
+# Persistence
+# -----------------------------
+def save_sketches(sketches, path):
+    sketches.to_parquet(path, index=False)
+
+
+def load_sketches(paths, keys):
+    """Load and merge stored per-partition sketches."""
+    return merge_sketches([pd.read_parquet(p) for p in paths], keys)
+
+
+def _partition_path(directory, rollup, value):
+    return os.path.join(directory, rollup, f"{PARTITION_COL}={value}.parquet")
+
+
+def write_partition_sketches(frame, directory, rollup, precision=DEFAULT_PRECISION):
+    """Write one sketch file per booking_date partition for a rollup.
+
+    Re-running a day overwrites that day's file, so incremental loads only
+    need to pass the new / changed partitions.
+    """
+    keys, id_col = ROLLUPS[rollup]
+    os.makedirs(os.path.join(directory, rollup), exist_ok=True)
+    for value, part in frame.groupby(PARTITION_COL, observed=True):
+        save_sketches(build_sketches(part, keys, id_col, precision), _partition_path(directory, rollup, value))
+
+
+def load_rollup(directory, rollup):
+    """Merge every stored partition of a rollup into one sketch per group."""
+    keys, _ = ROLLUPS[rollup]
+    paths = sorted(glob.glob(os.path.join(directory, rollup, f"{PARTITION_COL}=*.parquet")))
+    if not paths:
+        raise FileNotFoundError(f"No stored sketches for {rollup} under {directory}")
+    return load_sketches(paths, keys)
+
+
+# -----------------------------
+# Accuracy report
+# -----------------------------
+def accuracy_report(frame, precision=DEFAULT_PRECISION, rollups=ROLLUPS, sketch_dir=None):
+    """Exact vs. HLL counts for every rollup, with relative error per group.
+
+    With sketch_dir, the HLL side is the stored partition sketches and
+    `precision` is the one they were written with, not the argument.
+    """
+    rows = []
+    for rollup, (keys, id_col) in rollups.items():
+        exact = frame.groupby(keys, observed=True).agg(exact=(id_col, "nunique")).reset_index()
+        if sketch_dir:
+            stored = load_rollup(sketch_dir, rollup)
+            approx = estimate(stored, keys, "approx")
+            rollup_precision = next(iter(_precisions(stored)), precision)
+        else:
+            approx = approx_nunique(frame, keys, id_col, "approx", precision)
+            rollup_precision = precision
+        both = exact.merge(approx, on=keys, how="left")
+        rel_err = (both["approx"] - both["exact"]).abs() / both["exact"].clip(lower=1)
+        rows.append({
+            "rollup": rollup,
+            "precision": rollup_precision,
+            "groups": len(both),
+            "mean_rel_error": rel_err.mean(),
+            "max_rel_error": rel_err.max(),
+            "expected_std_error": 1.04 / np.sqrt(1 << rollup_precision),
+        })
+    return pd.DataFrame(rows)
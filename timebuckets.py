@@ -0,0 +1,83 @@
+# timebuckets.py
+# Precomputed hour / weekday buckets in UTC and in each invitee's timezone.
+#
+# payload.scheduled_event.start_time is UTC, so bucketing it directly
+# shifts the hour/day-of-week heatmap for every non-UTC invitee. This
+# stage converts timestamps once at load time, one vectorized
+# tz_convert per distinct payload.timezone (not per row), and stores
+# compact int8 columns:
+#   hour_utc, dow_utc, hour_local, dow_local   (dow: 0 = Monday, -1 = missing)
+# The heatmap, histogram and pie are then single np.bincount passes.
+import numpy as np
+import pandas as pd
+
+# -----------------------------
+# CONFIG
+# -----------------------------
+TZ_COL = 'payload.timezone'
+WEEKDAYS = ['Monday', 'Tuesday', 'Wednesday', 'Thursday', 'Friday', 'Saturday', 'Sunday']
+HOURS = list(range(24))
+
+
+def _hour_dow(ts):
+    hour = ts.dt.hour.fillna(-1).to_numpy(dtype=np.int8)
+    dow = ts.dt.dayofweek.fillna(-1).to_numpy(dtype=np.int8)
+    return hour, dow
+
+
+def add_time_buckets(final_df, ts_col='booking_timestamp', tz_col=TZ_COL):
+    """Add int8 hour/dow columns in UTC and in the invitee's local timezone.
+
+    Rows with a missing or unknown timezone keep their UTC buckets.
+    """
+    ts = pd.to_datetime(final_df[ts_col], utc=True)
+    hour_utc, dow_utc = _hour_dow(ts)
+    hour_local, dow_local = hour_utc.copy(), dow_utc.copy()
+
+    if tz_col in final_df:
+        zones = final_df[tz_col]
+        for zone, positions in zones.groupby(zones, sort=False).indices.items():
+            try:
+                local = ts.iloc[positions].dt.tz_convert(zone)
+            except (KeyError, ValueError, TypeError):
+                continue   # unknown zone name -> stay on UTC
+            hour_local[positions], dow_local[positions] = _hour_dow(local)
+
+    final_df['hour_utc'] = hour_utc
+    final_df['dow_utc'] = dow_utc
+    final_df['hour_local'] = hour_local
+    final_df['dow_local'] = dow_local
+    return final_df
+
+
+# -----------------------------
+# bincount aggregates
+# -----------------------------
+def _columns(frame, view):
+    return frame[f'hour_{view}'].to_numpy(), frame[f'dow_{view}'].to_numpy()
+
+
+def hour_dow_matrix(frame, view='local', id_col='booking_id'):
+    """7 x 24 booking counts (rows Monday..Sunday, columns hour 0..23).
+
+    With id_col, each id is counted once per cell, like groupby().nunique().
+    """
+    hour, dow = _columns(frame, view)
+    cells = dow.astype(np.int16) * 24 + hour
+    valid = (hour >= 0) & (dow >= 0)
+    if id_col:
+        ids = frame[id_col]
+        valid &= ids.notna().to_numpy()
+        valid &= ~pd.DataFrame({'id': ids.to_numpy(), 'cell': cells}).duplicated().to_numpy()
+    counts = np.bincount(cells[valid], minlength=7 * 24).reshape(7, 24)
+    return pd.DataFrame(counts, index=WEEKDAYS, columns=HOURS)
+
+
+def hour_counts(frame, view='local'):
+    hour, _ = _columns(frame, view)
+    return np.bincount(hour[hour >= 0], minlength=24)
+
+
+def dow_counts(frame, view='local'):
+    _, dow = _columns(frame, view)
+    return pd.Series(np.bincount(dow[dow >= 0], minlength=7), index=WEEKDAYS)